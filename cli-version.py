@@ -1,125 +1,140 @@
 import argparse
-import os
-import json
-import openai
+import asyncio
+import csv
+import io
+import pathlib
+import sys
 from dotenv import load_dotenv
-import nltk
-from nltk.sentiment import SentimentIntensityAnalyzer
+from copygen.core import (DEFAULT_MODEL, PREMIUM_MODEL, analyze_sentiment, analyze_sentiment_batch,
+                          format_hashtags, generate_ad_copy, generate_batch)
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Set up OpenAI API key
-openai.api_key = os.getenv("OPENAI_API_KEY")
+# Buffer size for saved copy files (1 MiB)
+WRITE_BUFFER_SIZE = 1 << 20
+TONES = ("Exciting", "Professional", "Casual")
 
-# Download NLTK resources for sentiment analysis
-try:
-    nltk.data.find('vader_lexicon')
-except LookupError:
-    nltk.download('vader_lexicon')
-
-def analyze_sentiment(text):
-    """
-    Analyze the sentiment of the provided text and return the dominant tone.
-    
-    Args:
-        text (str): Text to analyze
-        
-    Returns:
-        str: Dominant tone (Exciting, Professional, or Casual)
-    """
-    sia = SentimentIntensityAnalyzer()
-    sentiment_score = sia.polarity_scores(text)
-    
-    # Determine tone based on sentiment scores
-    if sentiment_score['compound'] >= 0.5:
-        return "Exciting"
-    elif sentiment_score['pos'] > sentiment_score['neg'] and sentiment_score['neu'] > 0.6:
-        return "Professional"
-    else:
-        return "Casual"
-
-def generate_ad_copy(brand_name, product_description, target_audience, tone=None):
-    """
-    Generate marketing ad copy using OpenAI's GPT API.
-    
-    Args:
-        brand_name (str): Name of the brand
-        product_description (str): Description of the product/service
-        target_audience (str): Target audience description
-        tone (str, optional): Desired tone for the copy
-        
-    Returns:
-        dict: Generated ad copy including headline, description, hashtags, and CTA
-    """
-    # Add tone instruction if provided
-    tone_instruction = f" The tone should be {tone}." if tone else ""
-    
-    # Create prompt for OpenAI
-    prompt = f"""
-    Generate marketing content for the following:
-    
-    Brand Name: {brand_name}
-    Product/Service Description: {product_description}
-    Target Audience: {target_audience}{tone_instruction}
-    
-    Please provide:
-    1. A short, catchy ad headline (maximum 10 words)
-    2. A marketing description (2-3 sentences highlighting key benefits)
-    3. Three relevant hashtags
-    4. A compelling call-to-action phrase
-    
-    Format the response as JSON with keys: headline, description, hashtags, and cta.
-    """
-    
-    try:
-        # Call OpenAI API
-        response = openai.ChatCompletion.create(
-            model="gpt-4",  # You can use a different model if needed
-            messages=[{"role": "system", "content": "You are a professional marketing copywriter who creates compelling, brand-appropriate ad copy."},
-                     {"role": "user", "content": prompt}],
-            max_tokens=250,
-            temperature=0.7,
-            response_format={"type": "json_object"}
-        )
-        
-        # Extract the generated content
-        content = response.choices[0].message.content
-        
-        # Parse JSON response
-        result = json.loads(content)
-        
-        return result
-    
-    except Exception as e:
-        return {
-            "headline": f"Error generating content: {str(e)}",
-            "description": "Please try again or check your API key.",
-            "hashtags": [],
-            "cta": ""
-        }
+def _echo_stream(chunks):
+    """Write streamed response text to the terminal as it arrives"""
+    for delta in chunks:
+        sys.stdout.write(delta)
+        sys.stdout.flush()
+    sys.stdout.write("\n")
 
 def format_output(result):
     """Format the result dictionary for terminal display"""
     output = "\n" + "=" * 50 + "\n"
     output += f"📢 HEADLINE:\n{result['headline']}\n\n"
     output += f"📝 DESCRIPTION:\n{result['description']}\n\n"
-    output += f"🏷️ HASHTAGS:\n" + " ".join([f"#{tag.replace('#', '').replace(' ', '')}" for tag in result['hashtags']]) + "\n\n"
+    output += f"🏷️ HASHTAGS:\n" + " ".join(format_hashtags(result['hashtags'])) + "\n\n"
     output += f"🔔 CALL TO ACTION:\n{result['cta']}\n"
     output += "=" * 50
     return output
 
+def run_batch(path, model):
+    """
+    Generate copy for every row of a CSV file and save the results next to it.
+    
+    Rows with a blank brand, product or audience, or an unknown tone, are skipped and
+    reported as failed in the output.
+    
+    Args:
+        path (str): CSV file with brand, product and audience columns, and an optional tone column
+        model (str): OpenAI chat model to generate with
+        
+    Returns:
+        pathlib.Path: Path of the CSV file the results were written to
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        missing_columns = {'brand', 'product', 'audience'} - set(reader.fieldnames or [])
+        if missing_columns:
+            raise SystemExit(f"{path} is missing columns: {', '.join(sorted(missing_columns))}")
+        # Missing trailing fields come back as None
+        rows = [{k: (v or '').strip() for k, v in row.items() if k is not None} for row in reader]
+    
+    # Rows with blank fields or an unknown tone are reported instead of sent to the API
+    results = [None] * len(rows)
+    tones = {tone.lower(): tone for tone in TONES}
+    for i, row in enumerate(rows):
+        blank = [column for column in ('brand', 'product', 'audience') if not row[column]]
+        if blank:
+            reason = f"missing {', '.join(blank)}"
+        elif row.get('tone') and row['tone'].lower() not in tones:
+            reason = f"unknown tone {row['tone']!r}, expected one of {', '.join(TONES)}"
+        else:
+            row['tone'] = tones.get(row.get('tone', '').lower(), '')
+            continue
+        # Line 1 of the file is the header
+        print(f"⚠️ Skipping line {i + 2}: {reason}")
+        results[i] = {"headline": f"Skipped row: {reason}", "description": "", "hashtags": [],
+                      "cta": "", "error": reason}
+    valid = [i for i, result in enumerate(results) if result is None]
+    
+    # Rows without a tone are scored together so the compiled lexicon scorer is set up once
+    missing = [i for i in valid if not rows[i]['tone']]
+    if missing:
+        print(f"📊 Detecting tone for {len(missing)} rows...")
+        texts = [f"{rows[i]['brand']} {rows[i]['product']} {rows[i]['audience']}" for i in missing]
+        for i, tone in zip(missing, analyze_sentiment_batch(texts)):
+            rows[i]['tone'] = tone
+    
+    print(f"\n✨ Generating marketing copy for {len(valid)} rows...")
+    specs = [{"brand_name": rows[i]['brand'], "product_description": rows[i]['product'],
+              "target_audience": rows[i]['audience'], "tone": rows[i]['tone'], "model": model} for i in valid]
+    for i, result in zip(valid, asyncio.run(generate_batch(specs))):
+        results[i] = result
+    
+    failed = sum(1 for result in results if result.get('error'))
+    if failed:
+        print(f"\n⚠️ {failed} of {len(rows)} rows failed; their rows in the output contain the error")
+    
+    # Build the whole file in memory, then encode and write it through one large buffer
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(["brand", "tone", "headline", "description", "hashtags", "cta"])
+    for row, result in zip(rows, results):
+        writer.writerow([row['brand'], row['tone'], result['headline'], result['description'],
+                         " ".join(format_hashtags(result['hashtags'])), result['cta']])
+    
+    source = pathlib.Path(path)
+    output_path = source.with_name(f"{source.stem}_marketing_copy.csv")
+    with open(output_path, 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+        f.write(out.getvalue().encode('utf-8'))
+    return output_path
+
 def main():
     """Main function to run the CLI tool"""
     parser = argparse.ArgumentParser(description="AI Marketing Copy Generator")
     
-    parser.add_argument('--brand', required=True, help="Brand name")
-    parser.add_argument('--product', required=True, help="Product or service description")
-    parser.add_argument('--audience', required=True, help="Target audience description")
-    parser.add_argument('--tone', required=False, choices=["Exciting", "Professional", "Casual"], 
+    parser.add_argument('--brand', help="Brand name")
+    parser.add_argument('--product', help="Product or service description")
+    parser.add_argument('--audience', help="Target audience description")
+    parser.add_argument('--tone', required=False, choices=TONES, 
                        help="Tone of voice (optional)")
+    parser.add_argument('--variants', type=int, default=1,
+                       help="Number of copy variants to generate concurrently (default: 1)")
+    parser.add_argument('--model', default=DEFAULT_MODEL,
+                       help=f"OpenAI chat model to use (default: {DEFAULT_MODEL})")
+    parser.add_argument('--premium', action='store_true',
+                       help=f"Use the higher quality {PREMIUM_MODEL} model")
+    parser.add_argument('--no-cache', action='store_true',
+                       help="Generate fresh copy instead of reusing copy cached within the last day")
+    parser.add_argument('--batch', metavar='FILE.csv',
+                       help="Generate copy for every row of a CSV file with brand, product, audience "
+                            "and optional tone columns")
     
     args = parser.parse_args()
+    model = PREMIUM_MODEL if args.premium else args.model
+    
+    if args.batch:
+        output_path = run_batch(args.batch, model)
+        print(f"\n✅ Saved to {output_path}")
+        return
+    
+    if not (args.brand and args.product and args.audience):
+        parser.error("--brand, --product and --audience are required unless --batch is given")
     
     print("\n🔍 Analyzing inputs...")
     
@@ -131,20 +146,35 @@ def main():
         print(f"📊 Detected tone: {tone}")
     
     print("\n✨ Generating marketing copy...")
-    result = generate_ad_copy(args.brand, args.product, args.audience, tone)
+    if args.variants > 1:
+        # Variants are requested fresh and concurrently so each one is a distinct completion
+        spec = {"brand_name": args.brand, "product_description": args.product,
+                "target_audience": args.audience, "tone": tone, "model": model}
+        results = asyncio.run(generate_batch([spec] * args.variants))
+    else:
+        # A single copy is echoed to the terminal as it streams in
+        results = [generate_ad_copy(args.brand, args.product, args.audience, tone, model,
+                                    render_stream=_echo_stream, use_cache=not args.no_cache)]
     
-    print(format_output(result))
+    for result in results:
+        print(format_output(result))
     
     # Ask if user wants to save to file
     save = input("\nSave this copy to a file? (y/n): ").lower()
     if save == 'y':
-        filename = f"{args.brand.replace(' ', '_').lower()}_marketing_copy.txt"
-        with open(filename, 'w') as f:
-            f.write(f"HEADLINE: {result['headline']}\n\n")
-            f.write(f"DESCRIPTION: {result['description']}\n\n")
-            f.write(f"HASHTAGS: {' '.join(['#' + h.replace('#', '').replace(' ', '') for h in result['hashtags']])}\n\n")
-            f.write(f"CALL TO ACTION: {result['cta']}")
-        print(f"\n✅ Saved to {filename}")
+        for i, result in enumerate(results, start=1):
+            suffix = f"_{i}" if len(results) > 1 else ""
+            filename = f"{args.brand.replace(' ', '_').lower()}_marketing_copy{suffix}.txt"
+            # Build the whole file first so it goes out in a single write
+            content = "\n\n".join([
+                f"HEADLINE: {result['headline']}",
+                f"DESCRIPTION: {result['description']}",
+                f"HASHTAGS: {' '.join(format_hashtags(result['hashtags']))}",
+                f"CALL TO ACTION: {result['cta']}",
+            ])
+            with open(filename, 'w', encoding='utf-8', buffering=WRITE_BUFFER_SIZE) as f:
+                f.write(content)
+            print(f"\n✅ Saved to {filename}")
 
 if __name__ == "__main__":
     main()
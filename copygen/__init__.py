@@ -0,0 +1 @@
+"""Shared ad copy generation logic for the CLI and Streamlit front-ends"""
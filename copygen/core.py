@@ -0,0 +1,578 @@
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+import math
+import os
+import pathlib
+import re
+import shelve
+import threading
+import time
+import orjson
+
+logger = logging.getLogger(__name__)
+
+# Heavy dependencies (openai, httpx, numpy, nltk) are imported on first use so that
+# front-ends start quickly and runs with an explicit tone never load NLTK
+
+# Default chat model, and the one used when higher quality is requested
+DEFAULT_MODEL = "gpt-4o-mini"
+PREMIUM_MODEL = "gpt-4o"
+
+# On-disk cache of generated copy, keyed on the request inputs
+CACHE_PATH = "llm_cache"
+# Cached copy older than this (24 hours) is regenerated
+CACHE_TTL = 24 * 60 * 60
+# Most results kept on disk; beyond this, expired and then the oldest entries are pruned
+CACHE_MAX_ENTRIES = 1000
+
+# Near-duplicate inputs whose embeddings are at least this similar reuse cached copy.
+# Only requests for the same model, brand and tone are compared, on product and audience text
+EMBEDDING_MODEL = "text-embedding-3-small"
+SEMANTIC_THRESHOLD = 0.92
+EMBEDDINGS_KEY = "_embeddings"
+# Most embeddings kept per model, brand and tone; the oldest are dropped first
+SEMANTIC_CACHE_SIZE = 256
+
+# Most requests generate_batch keeps in flight, matching the keep-alive pool size
+BATCH_CONCURRENCY = 20
+
+# shelve does not support concurrent access, and the web app serves sessions from threads
+_cache_lock = threading.Lock()
+
+# Characters removed from model-supplied hashtags before display
+_HASHTAG_STRIP = str.maketrans('', '', '# \t\n')
+
+# Static instructions sent first on every request so the provider can cache the prefix
+SYSTEM_PROMPT = """You are a professional marketing copywriter who creates compelling, brand-appropriate ad copy.
+
+Generate marketing content for the brand, product/service, target audience and tone given by the user.
+If the tone is "auto", choose the tone that best suits the brand and audience.
+
+Please provide:
+1. A short, catchy ad headline (maximum 10 words)
+2. A marketing description (2-3 sentences highlighting key benefits)
+3. Three relevant hashtags
+4. A compelling call-to-action phrase
+
+Return the copy by calling the emit_ad_copy function."""
+
+# Variable tail of the prompt, sent as the user message
+_PROMPT_TMPL = "Brand: {brand}\nProduct: {product}\nAudience: {audience}\nTone: {tone}"
+
+# Function the model must call to return the ad copy, so the arguments arrive as
+# schema-validated JSON. Strict mode does not accept length keywords, so the limits
+# are given to the model through the field descriptions
+AD_COPY_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "emit_ad_copy",
+        "description": "Return the generated marketing copy",
+        "strict": True,
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "headline": {"type": "string", "description": "Ad headline, at most 10 words and 80 characters"},
+                "description": {"type": "string", "description": "2-3 sentences, at most 300 characters"},
+                "hashtags": {
+                    "type": "array",
+                    "description": "Exactly three hashtags, each at most 24 characters",
+                    "items": {"type": "string"}
+                },
+                "cta": {"type": "string", "description": "Call-to-action phrase, at most 60 characters"}
+            },
+            "required": ["headline", "description", "hashtags", "cta"],
+            "additionalProperties": False
+        }
+    }
+}
+_TOOL_CHOICE = {"type": "function", "function": {"name": "emit_ad_copy"}}
+
+# Indicator words for the keyword fast path of analyze_sentiment
+_TONE_KEYWORDS = (
+    ("Exciting", frozenset({
+        "amazing", "awesome", "bold", "epic", "exciting", "extreme", "incredible", "innovative",
+        "revolutionary", "thrilling", "ultimate", "unleash", "adventure", "adventurous", "powerful",
+        "energy", "energetic", "fast", "wow", "game-changing", "breakthrough", "unstoppable",
+    })),
+    ("Professional", frozenset({
+        "professional", "professionals", "business", "businesses", "enterprise", "corporate",
+        "executives", "reliable", "secure", "solution", "solutions", "efficient", "productivity",
+        "compliance", "consulting", "b2b", "financial", "analytics", "management", "industry",
+        "clients", "teams", "workflow", "expertise",
+    })),
+    ("Casual", frozenset({
+        "casual", "everyday", "relaxed", "cozy", "comfy", "comfortable", "friends", "family",
+        "chill", "easy", "simple", "home", "weekend", "snacks", "laid-back", "hangout", "kids",
+        "students", "pets", "friendly",
+    })),
+)
+_TOKEN_RE = re.compile(r"[a-z0-9'-]+")
+# Minimum lead in keyword hits over the runner-up for the fast path to decide
+_DECISIVE_MARGIN = 2
+# Marker written once the VADER lexicon is known to be installed, so later
+# processes skip nltk's data path search
+VADER_SENTINEL = pathlib.Path.home() / ".copygen_vader_ok"
+# VADER is only fed this much text; very long inputs can trigger slow emoticon handling
+_MAX_SENTIMENT_CHARS = 500
+
+def format_hashtags(hashtags):
+    """Return model-supplied hashtags normalised to '#tag' form"""
+    return ['#' + tag.translate(_HASHTAG_STRIP) for tag in hashtags]
+
+@functools.lru_cache(maxsize=1)
+def _get_client():
+    """Return the shared OpenAI client, backed by a keep-alive connection pool"""
+    import httpx
+    from openai import OpenAI
+    http_client = httpx.Client(
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=40),
+        timeout=30.0
+    )
+    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"), http_client=http_client)
+
+def _make_async_client():
+    """Create an async OpenAI client; it is tied to the event loop that uses it"""
+    import httpx
+    from openai import AsyncOpenAI
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=40),
+        timeout=30.0
+    )
+    return AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), http_client=http_client)
+
+def _keyword_tone(text):
+    """Return the tone whose indicator words clearly dominate text, or None if ambiguous"""
+    counts = [0] * len(_TONE_KEYWORDS)
+    for token in _TOKEN_RE.findall(text.lower()):
+        for i, (_, words) in enumerate(_TONE_KEYWORDS):
+            if token in words:
+                counts[i] += 1
+    ranked = sorted(range(len(counts)), key=counts.__getitem__, reverse=True)
+    if counts[ranked[0]] - counts[ranked[1]] >= _DECISIVE_MARGIN:
+        return _TONE_KEYWORDS[ranked[0]][0]
+    return None
+
+@functools.lru_cache(maxsize=1)
+def _get_sia():
+    """Return a shared SentimentIntensityAnalyzer so the VADER lexicon is loaded once"""
+    import nltk
+    from nltk.sentiment import SentimentIntensityAnalyzer
+    
+    # Download NLTK resources for sentiment analysis
+    marked = VADER_SENTINEL.exists()
+    if not marked:
+        try:
+            nltk.data.find('sentiment/vader_lexicon.zip')
+        except LookupError:
+            nltk.download('vader_lexicon', quiet=True)
+    
+    try:
+        sia = SentimentIntensityAnalyzer()
+    except LookupError:
+        # The lexicon is missing, possibly removed after the marker was written
+        if marked:
+            marked = False
+            try:
+                VADER_SENTINEL.unlink(missing_ok=True)
+            except OSError:
+                pass
+        nltk.download('vader_lexicon', quiet=True)
+        sia = SentimentIntensityAnalyzer()
+    
+    # Only mark the lexicon as installed once it has actually loaded
+    if not marked:
+        try:
+            VADER_SENTINEL.touch()
+        except OSError:
+            pass
+    return sia
+
+def warm_up():
+    """
+    Build the sentiment analyzer and OpenAI client ahead of the first request.
+    
+    Failures are only logged; they resurface, and are handled, when the resource is used.
+    """
+    for build in (_get_sia, _get_client):
+        try:
+            build()
+        except Exception as e:
+            logger.warning("Could not preload %s: %s", build.__name__, e)
+
+def analyze_sentiment(text):
+    """
+    Analyze the sentiment of the provided text and return the dominant tone.
+    
+    Args:
+        text (str): Text to analyze
+        
+    Returns:
+        str: Dominant tone (Exciting, Professional, or Casual)
+    """
+    # Short, clear-cut inputs are decided by keywords without running VADER
+    tone = _keyword_tone(text)
+    if tone:
+        return tone
+    
+    sia = _get_sia()
+    sentiment_score = sia.polarity_scores(text[:_MAX_SENTIMENT_CHARS])
+    return _tone_from_scores(sentiment_score)
+
+def _tone_from_scores(sentiment_score):
+    """Map VADER-style compound/pos/neg/neu scores to a tone"""
+    if sentiment_score['compound'] >= 0.5:
+        return "Exciting"
+    elif sentiment_score['pos'] > sentiment_score['neg'] and sentiment_score['neu'] > 0.6:
+        return "Professional"
+    else:
+        return "Casual"
+
+def _score_segments(ids, offsets, valence, negates, n_scalar, totals):
+    """
+    Accumulate lexicon scores for many texts in one pass.
+    
+    ids holds the token ids of every text back to back, and text j spans
+    ids[offsets[j]:offsets[j + 1]]. Like VADER, a word's valence is scaled by n_scalar
+    for each negation among the three tokens before it. Row j of totals receives the
+    valence sum and the VADER-style positive, negative and neutral totals for text j.
+    """
+    for j in range(len(offsets) - 1):
+        for k in range(offsets[j], offsets[j + 1]):
+            v = valence[ids[k]]
+            if v != 0:
+                for back in range(1, 4):
+                    if k - back >= offsets[j] and negates[ids[k - back]]:
+                        v *= n_scalar
+            totals[j, 0] += v
+            if v > 0:
+                totals[j, 1] += v + 1
+            elif v < 0:
+                totals[j, 2] += 1 - v
+            else:
+                totals[j, 3] += 1
+
+@functools.lru_cache(maxsize=1)
+def _get_segment_scorer():
+    """Return _score_segments compiled with Numba when it is installed"""
+    try:
+        import numba
+    except ImportError:
+        return _score_segments
+    return numba.njit(cache=True)(_score_segments)
+
+@functools.lru_cache(maxsize=1)
+def _get_lexicon_table():
+    """
+    Return the VADER lexicon as lookup tables for _score_segments.
+    
+    Returns:
+        tuple: word -> id dict, valence array and negation flag array. Negation words
+            outside the lexicon get ids of their own; the second-to-last id stands for any
+            other word containing "n't" and the last id for unknown words.
+    """
+    import numpy as np
+    sia = _get_sia()
+    vocab = {word: i for i, word in enumerate(sia.lexicon)}
+    # VADER only treats a preceding word as a negation when it carries no valence itself
+    for word in sorted(sia.constants.NEGATE):
+        vocab.setdefault(word, len(vocab))
+    valence = np.zeros(len(vocab) + 2, dtype=np.float64)
+    valence[:len(sia.lexicon)] = list(sia.lexicon.values())
+    negates = np.zeros(len(vocab) + 2, dtype=np.bool_)
+    negates[len(sia.lexicon):-1] = True
+    return vocab, valence, negates
+
+def analyze_sentiment_batch(texts):
+    """
+    Detect the tone of many texts at once, for bulk processing.
+    
+    Texts the keyword fast path cannot decide are scored against the VADER lexicon by a
+    single compiled pass over all their tokens, instead of a full VADER run per text.
+    That pass handles negation but not VADER's boosters, capitals, punctuation emphasis,
+    "but" clauses or idioms, so borderline texts can get a different tone than
+    analyze_sentiment gives them.
+    
+    Args:
+        texts (list[str]): Texts to analyze
+        
+    Returns:
+        list[str]: Dominant tone for each text (Exciting, Professional, or Casual)
+    """
+    tones = [_keyword_tone(text) for text in texts]
+    pending = [i for i, tone in enumerate(tones) if tone is None]
+    if not pending:
+        return tones
+    
+    import numpy as np
+    vocab, valence, negates = _get_lexicon_table()
+    contraction = len(valence) - 2
+    unknown = len(valence) - 1
+    ids = []
+    offsets = [0]
+    for i in pending:
+        tokens = _TOKEN_RE.findall(texts[i][:_MAX_SENTIMENT_CHARS].lower())
+        ids.extend(vocab.get(token, contraction if "n't" in token else unknown) for token in tokens)
+        offsets.append(len(ids))
+    
+    totals = np.zeros((len(pending), 4), dtype=np.float64)
+    _get_segment_scorer()(np.asarray(ids, dtype=np.int64), np.asarray(offsets, dtype=np.int64), valence,
+                          negates, _get_sia().constants.N_SCALAR, totals)
+    
+    for i, (raw, pos, neg, neu) in zip(pending, totals):
+        total = pos + neg + neu
+        tones[i] = _tone_from_scores({
+            # Same normalisation VADER applies to the valence sum (alpha = 15)
+            "compound": raw / math.sqrt(raw * raw + 15),
+            "pos": pos / total if total else 0.0,
+            "neg": neg / total if total else 0.0,
+            "neu": neu / total if total else 0.0,
+        })
+    return tones
+
+def _cache_key(brand_name, product_description, target_audience, tone, model):
+    """Build a stable cache key from the generation inputs"""
+    payload = json.dumps([brand_name, product_description, target_audience, tone, model], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def _embeddings_key(model, brand_name, tone):
+    """Return the cache entry holding embeddings for one model, brand and tone"""
+    payload = json.dumps([model, brand_name, tone])
+    return f"{EMBEDDINGS_KEY}:{hashlib.sha256(payload.encode()).hexdigest()}"
+
+def _embed(product_description, target_audience):
+    """Return a unit-length embedding of the product and audience, or None if embedding fails"""
+    text = f"{product_description} | {target_audience}"
+    try:
+        response = _get_client().embeddings.create(model=EMBEDDING_MODEL, input=text)
+    except Exception:
+        return None
+    import numpy as np
+    vector = np.asarray(response.data[0].embedding, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+def _cached_result(cache, key):
+    """Return the result cached under key, or None if it is missing or has expired"""
+    entry = cache.get(key)
+    # Entries written before expiry was tracked have no timestamp and count as expired
+    if not isinstance(entry, dict) or "created" not in entry:
+        return None
+    if time.time() - entry["created"] > CACHE_TTL:
+        return None
+    return entry["result"]
+
+def _prune_cache(cache):
+    """Shrink the cache to three quarters of CACHE_MAX_ENTRIES once it grows past the cap"""
+    result_keys = [k for k in cache.keys() if not k.startswith(EMBEDDINGS_KEY)]
+    if len(result_keys) <= CACHE_MAX_ENTRIES:
+        return
+    
+    # Drop expired and unreadable entries first, then the oldest remaining ones
+    created = {}
+    for k in result_keys:
+        entry = cache.get(k)
+        if isinstance(entry, dict) and "created" in entry and time.time() - entry["created"] <= CACHE_TTL:
+            created[k] = entry["created"]
+        else:
+            del cache[k]
+    for k in sorted(created, key=created.get)[:max(0, len(created) - CACHE_MAX_ENTRIES * 3 // 4)]:
+        del cache[k]
+        del created[k]
+    
+    # Remove embeddings that no longer point at any cached result
+    for embeddings_key in [k for k in cache.keys() if k.startswith(EMBEDDINGS_KEY)]:
+        embeddings = cache[embeddings_key]
+        live = [i for i, k in enumerate(embeddings["keys"]) if k in created]
+        if not live:
+            del cache[embeddings_key]
+        elif len(live) < len(embeddings["keys"]):
+            cache[embeddings_key] = {"keys": [embeddings["keys"][i] for i in live],
+                                     "vectors": embeddings["vectors"][live]}
+
+def _semantic_lookup(cache, embeddings_key, vector):
+    """Return the cached result whose embedding best matches vector, if close enough"""
+    embeddings = cache.get(embeddings_key)
+    if embeddings is None:
+        return None
+    import numpy as np
+    scores = embeddings["vectors"] @ vector
+    best = int(np.argmax(scores))
+    if scores[best] >= SEMANTIC_THRESHOLD:
+        return _cached_result(cache, embeddings["keys"][best])
+    return None
+
+def _semantic_store(cache, embeddings_key, key, vector):
+    """Append vector for the result cached under key, evicting the oldest beyond SEMANTIC_CACHE_SIZE"""
+    import numpy as np
+    embeddings = cache.get(embeddings_key)
+    if embeddings is None:
+        keys, vectors = [key], vector[np.newaxis]
+    else:
+        keys = embeddings["keys"] + [key]
+        vectors = np.vstack([embeddings["vectors"], vector])
+    # Vectors are kept as one stacked array so they pickle as a single buffer
+    cache[embeddings_key] = {"keys": keys[-SEMANTIC_CACHE_SIZE:],
+                             "vectors": vectors[-SEMANTIC_CACHE_SIZE:]}
+
+def _completion_request(brand_name, product_description, target_audience, tone, model):
+    """Build the chat completion arguments shared by the sync and async paths"""
+    # Only the variable inputs go in the user message; the system prompt stays byte-identical
+    prompt = _PROMPT_TMPL.format_map({"brand": brand_name, "product": product_description,
+                                      "audience": target_audience, "tone": tone or "auto"})
+    
+    return {
+        "model": model,
+        "messages": [{"role": "system", "content": SYSTEM_PROMPT},
+                     {"role": "user", "content": prompt}],
+        "max_tokens": 180,
+        "temperature": 0.7,
+        "tools": [AD_COPY_TOOL],
+        "tool_choice": _TOOL_CHOICE
+    }
+
+def _error_result(error):
+    """Placeholder copy shown when generation fails"""
+    return {
+        "headline": f"Error generating content: {str(error)}",
+        "description": "Please try again or check your API key.",
+        "hashtags": [],
+        "cta": "",
+        "error": str(error)
+    }
+
+def _stream_completion(brand_name, product_description, target_audience, tone, model, buffer):
+    """Yield emit_ad_copy argument fragments from a streamed completion, collecting them in buffer"""
+    stream = _get_client().chat.completions.create(
+        **_completion_request(brand_name, product_description, target_audience, tone, model),
+        stream=True
+    )
+    for chunk in stream:
+        tool_calls = chunk.choices[0].delta.tool_calls
+        if not tool_calls:
+            continue
+        delta = tool_calls[0].function.arguments
+        if delta:
+            buffer.append(delta)
+            yield delta
+
+def generate_ad_copy(brand_name, product_description, target_audience, tone=None, model=DEFAULT_MODEL,
+                     render_stream=None, use_cache=True):
+    """
+    Generate marketing ad copy using OpenAI's GPT API.
+    
+    Args:
+        brand_name (str): Name of the brand
+        product_description (str): Description of the product/service
+        target_audience (str): Target audience description
+        tone (str, optional): Desired tone for the copy
+        model (str, optional): OpenAI chat model to generate with
+        render_stream (callable, optional): Consumes the response text generator as it
+            arrives, e.g. a Streamlit placeholder's write_stream
+        use_cache (bool, optional): Reuse copy cached within the last day for matching inputs;
+            fresh copy is cached either way
+        
+    Returns:
+        dict: Generated ad copy including headline, description, hashtags, and CTA
+    """
+    # Reuse a previous result for identical inputs
+    key = _cache_key(brand_name, product_description, target_audience, tone, model)
+    try:
+        if use_cache:
+            with _cache_lock, shelve.open(CACHE_PATH) as cache:
+                result = _cached_result(cache, key)
+            if result is not None:
+                return result
+    except Exception as e:
+        # An unusable cache only costs a fresh API call
+        logger.warning("Could not read the response cache at %s: %s", CACHE_PATH, e)
+    
+    try:
+        # Fall back to a near-duplicate match on the input embeddings
+        embeddings_key = _embeddings_key(model, brand_name, tone)
+        vector = _embed(product_description, target_audience)
+        if use_cache and vector is not None:
+            try:
+                with _cache_lock, shelve.open(CACHE_PATH) as cache:
+                    result = _semantic_lookup(cache, embeddings_key, vector)
+            except Exception as e:
+                logger.warning("Could not read the response cache at %s: %s", CACHE_PATH, e)
+                result = None
+            if result is not None:
+                return result
+        
+        # Stream the function arguments, then parse the accumulated JSON once it is complete
+        buffer = []
+        chunks = _stream_completion(brand_name, product_description, target_audience, tone, model, buffer)
+        if render_stream:
+            render_stream(chunks)
+        else:
+            for _ in chunks:
+                pass
+        result = orjson.loads("".join(buffer))
+    
+    except Exception as e:
+        return _error_result(e)
+    
+    # A failed cache write must not discard copy that was generated successfully
+    try:
+        with _cache_lock, shelve.open(CACHE_PATH) as cache:
+            cache[key] = {"result": result, "created": time.time()}
+            if vector is not None:
+                _semantic_store(cache, embeddings_key, key, vector)
+            _prune_cache(cache)
+    except Exception as e:
+        logger.warning("Could not write the response cache at %s: %s", CACHE_PATH, e)
+    
+    return result
+
+async def generate_ad_copy_async(client, brand_name, product_description, target_audience, tone=None,
+                                 model=DEFAULT_MODEL):
+    """
+    Generate a fresh, uncached piece of ad copy without blocking other requests.
+    
+    Args:
+        client (AsyncOpenAI): Client bound to the running event loop
+        brand_name (str): Name of the brand
+        product_description (str): Description of the product/service
+        target_audience (str): Target audience description
+        tone (str, optional): Desired tone for the copy
+        model (str, optional): OpenAI chat model to generate with
+        
+    Returns:
+        dict: Generated ad copy including headline, description, hashtags, and CTA
+    """
+    try:
+        response = await client.chat.completions.create(
+            **_completion_request(brand_name, product_description, target_audience, tone, model)
+        )
+        return orjson.loads(response.choices[0].message.tool_calls[0].function.arguments)
+    
+    except Exception as e:
+        return _error_result(e)
+
+async def generate_batch(specs):
+    """
+    Generate ad copy for several input specs concurrently, at most BATCH_CONCURRENCY at a time.
+    
+    Args:
+        specs (list[dict]): Keyword arguments for generate_ad_copy_async (without the
+            client), one dict per copy
+        
+    Returns:
+        list[dict]: Generated ad copy, in the same order as specs; failed entries carry an
+            "error" key
+    """
+    # Unbounded fan-out would queue requests on the connection pool until they time out
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    
+    async def generate(spec):
+        async with semaphore:
+            return await generate_ad_copy_async(client, **spec)
+    
+    client = _make_async_client()
+    try:
+        return await asyncio.gather(*[generate(spec) for spec in specs])
+    finally:
+        await client.close()
@@ -1,103 +1,74 @@
 import streamlit as st
-import openai
-import os
+import asyncio
 from dotenv import load_dotenv
-import nltk
-from nltk.sentiment import SentimentIntensityAnalyzer
+from copygen.core import (DEFAULT_MODEL, PREMIUM_MODEL, analyze_sentiment, format_hashtags,
+                          generate_ad_copy, generate_batch, warm_up)
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Set up OpenAI API key
-openai.api_key = os.getenv("OPENAI_API_KEY")
+# Number of copies generated when variants are requested
+VARIANT_COUNT = 3
 
-# Download NLTK resources for sentiment analysis
-try:
-    nltk.data.find('vader_lexicon')
-except LookupError:
-    nltk.download('vader_lexicon')
+@st.cache_resource(show_spinner="Loading language models...")
+def _warm_resources():
+    """Load the sentiment analyzer and OpenAI client once per server, on the first page render"""
+    warm_up()
+    return True
 
-def analyze_sentiment(text):
+@st.cache_data(show_spinner=False)
+def _cached_sentiment(text):
+    """Tone detection memoised across reruns and sessions"""
+    return analyze_sentiment(text)
+
+def render_result(result, brand_name, index=None):
     """
-    Analyze the sentiment of the provided text and return the dominant tone.
+    Display one piece of generated copy with a download button.
     
     Args:
-        text (str): Text to analyze
-        
-    Returns:
-        str: Dominant tone (Exciting, Professional, or Casual)
+        result (dict): Generated ad copy
+        brand_name (str): Name of the brand, used for the download file name
+        index (int, optional): Position of the copy when several variants are shown
     """
-    sia = SentimentIntensityAnalyzer()
-    sentiment_score = sia.polarity_scores(text)
+    # Display headline
+    st.subheader("Ad Headline:")
+    st.markdown(f"### {result['headline']}")
     
-    # Determine tone based on sentiment scores
-    if sentiment_score['compound'] >= 0.5:
-        return "Exciting"
-    elif sentiment_score['pos'] > sentiment_score['neg'] and sentiment_score['neu'] > 0.6:
-        return "Professional"
-    else:
-        return "Casual"
-
-def generate_ad_copy(brand_name, product_description, target_audience, tone=None):
-    """
-    Generate marketing ad copy using OpenAI's GPT API.
+    # Display description
+    st.subheader("Marketing Description:")
+    st.write(result['description'])
     
-    Args:
-        brand_name (str): Name of the brand
-        product_description (str): Description of the product/service
-        target_audience (str): Target audience description
-        tone (str, optional): Desired tone for the copy
-        
-    Returns:
-        dict: Generated ad copy including headline, description, hashtags, and CTA
-    """
-    # Add tone instruction if provided
-    tone_instruction = f" The tone should be {tone}." if tone else ""
+    # Display hashtags and CTA in columns
+    col1, col2 = st.columns(2)
     
-    # Create prompt for OpenAI
-    prompt = f"""
-    Generate marketing content for the following:
+    with col1:
+        st.subheader("Hashtags:")
+        for hashtag in format_hashtags(result['hashtags']):
+            st.write(hashtag)
     
-    Brand Name: {brand_name}
-    Product/Service Description: {product_description}
-    Target Audience: {target_audience}{tone_instruction}
+    with col2:
+        st.subheader("Call to Action:")
+        st.write(result['cta'])
     
-    Please provide:
-    1. A short, catchy ad headline (maximum 10 words)
-    2. A marketing description (2-3 sentences highlighting key benefits)
-    3. Three relevant hashtags
-    4. A compelling call-to-action phrase
+    # Add a download button for the copy
+    copy_text = f"""
+    # {result['headline']}
     
-    Format the response as JSON with keys: headline, description, hashtags, and cta.
-    """
+    {result['description']}
     
-    try:
-        # Call OpenAI API
-        response = openai.ChatCompletion.create(
-            model="gpt-4",  # You can use a different model if needed
-            messages=[{"role": "system", "content": "You are a professional marketing copywriter who creates compelling, brand-appropriate ad copy."},
-                     {"role": "user", "content": prompt}],
-            max_tokens=250,
-            temperature=0.7,
-            response_format={"type": "json_object"}
-        )
-        
-        # Extract the generated content
-        content = response.choices[0].message.content
-        
-        # Parse JSON response
-        import json
-        result = json.loads(content)
-        
-        return result
+    Hashtags: {' '.join(format_hashtags(result['hashtags']))}
     
-    except Exception as e:
-        return {
-            "headline": f"Error generating content: {str(e)}",
-            "description": "Please try again or check your API key.",
-            "hashtags": [],
-            "cta": ""
-        }
+    CTA: {result['cta']}
+    """
+    
+    suffix = f"_{index + 1}" if index is not None else ""
+    st.download_button(
+        label="Download Copy",
+        data=copy_text,
+        file_name=f"{brand_name}_marketing_copy{suffix}.txt",
+        mime="text/plain",
+        key=f"download_{index}"
+    )
 
 def main():
     """
@@ -109,6 +80,8 @@ def main():
         layout="centered"
     )
     
+    _warm_resources()
+    
     st.title("✨ AI Marketing Copy Generator")
     st.write("Generate engaging marketing copy tailored to your brand and audience")
     
@@ -130,6 +103,12 @@ def main():
         tone_options = ["Auto-detect", "Exciting", "Professional", "Casual"]
         selected_tone = st.selectbox("Tone of Voice", tone_options)
         
+        quality = st.radio("Quality", ["Fast", "Premium"], horizontal=True)
+        
+        generate_variants = st.checkbox(f"Generate {VARIANT_COUNT} variants")
+        
+        regenerate = st.checkbox("Regenerate (ignore copy cached for these inputs)")
+        
         submitted = st.form_submit_button("Generate Ad Copy")
     
     # Process submission
@@ -142,54 +121,35 @@ def main():
                 tone = None
                 if selected_tone == "Auto-detect":
                     combined_text = f"{brand_name} {product_description} {target_audience}"
-                    tone = analyze_sentiment(combined_text)
+                    tone = _cached_sentiment(combined_text)
                     st.info(f"Detected tone: {tone}")
                 elif selected_tone != "Auto-detect":
                     tone = selected_tone
                 
-                # Generate the ad copy
-                result = generate_ad_copy(brand_name, product_description, target_audience, tone)
+                model = PREMIUM_MODEL if quality == "Premium" else DEFAULT_MODEL
+                
+                # Generate the ad copy; variants are requested concurrently
+                if generate_variants:
+                    spec = {"brand_name": brand_name, "product_description": product_description,
+                            "target_audience": target_audience, "tone": tone, "model": model}
+                    results = asyncio.run(generate_batch([spec] * VARIANT_COUNT))
+                else:
+                    # Show the response as it streams in, then replace it with the formatted copy
+                    placeholder = st.empty()
+                    results = [generate_ad_copy(brand_name, product_description, target_audience, tone, model,
+                                                render_stream=placeholder.write_stream,
+                                                use_cache=not regenerate)]
+                    placeholder.empty()
                 
                 # Display results in a nice format
                 st.success("Your marketing copy is ready!")
                 
-                # Display headline
-                st.subheader("Ad Headline:")
-                st.markdown(f"### {result['headline']}")
-                
-                # Display description
-                st.subheader("Marketing Description:")
-                st.write(result['description'])
-                
-                # Display hashtags and CTA in columns
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    st.subheader("Hashtags:")
-                    for hashtag in result['hashtags']:
-                        st.write(f"#{hashtag.replace('#', '').replace(' ', '')}")
-                
-                with col2:
-                    st.subheader("Call to Action:")
-                    st.write(result['cta'])
-                
-                # Add a download button for the copy
-                copy_text = f"""
-                # {result['headline']}
-                
-                {result['description']}
-                
-                Hashtags: {' '.join(['#' + h.replace('#', '').replace(' ', '') for h in result['hashtags']])}
-                
-                CTA: {result['cta']}
-                """
-                
-                st.download_button(
-                    label="Download Copy",
-                    data=copy_text,
-                    file_name=f"{brand_name}_marketing_copy.txt",
-                    mime="text/plain"
-                )
+                if len(results) == 1:
+                    render_result(results[0], brand_name)
+                else:
+                    for index, result in enumerate(results):
+                        st.header(f"Variant {index + 1}")
+                        render_result(result, brand_name, index)
 
 if __name__ == "__main__":
     main()
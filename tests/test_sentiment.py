@@ -0,0 +1,29 @@
+import pytest
+
+pytest.importorskip("numpy")
+nltk = pytest.importorskip("nltk")
+
+from copygen.core import analyze_sentiment, analyze_sentiment_batch
+
+try:
+    nltk.data.find('sentiment/vader_lexicon.zip')
+except LookupError:
+    pytest.skip("VADER lexicon is not installed", allow_module_level=True)
+
+# None of these are decided by the keyword fast path, so both functions fall through to VADER scoring
+TEXTS = [
+    "Acme A great product that is not bad at all for people",
+    "Acme Shoes that never fail for runners",
+    "Bolt A phone that isn't good for teens",
+    "Nova A calm and reliable service for families",
+    "Zed A terrible but cheap gadget for students",
+    "Orbit Not the best and not the worst tablet for adults",
+]
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_batch_tone_matches_single(text):
+    assert analyze_sentiment_batch([text]) == [analyze_sentiment(text)]
+
+def test_batch_scores_texts_independently():
+    # Negations must not carry over from the end of one text to the start of the next
+    assert analyze_sentiment_batch(TEXTS) == [analyze_sentiment(text) for text in TEXTS]